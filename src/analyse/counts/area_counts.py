@@ -7,9 +7,8 @@
 # ### Importing libraries
 
 import os
-import pandas as pd
 
-from helpers import toml_stats
+from helpers import toml_stats, read_reports, merge_counts, CI_NAME, mean_ci, median_ci, quantile_ci
 
 PATH = os.path.dirname(__file__)
 DATA_PATH = os.path.abspath(f"{PATH}/data")
@@ -18,31 +17,40 @@ REPORTS_PATH = os.path.abspath(f"{PATH}/../../data")
 # %% [markdown]
 # ### Reading the reports
 
-reports = pd.read_csv(f"{REPORTS_PATH}/reports-analysed.csv")
+chunks = read_reports(
+  f"{REPORTS_PATH}/reports-analysed.csv",
+  ['date_of_report', 'coroner_area']
+)
 
 # %% [markdown]
-# ### Calculating the year of each report
+# ### Counting the number of reports in each coroner area
 
-# use a regex to extract the year from the date of report
-reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
+value_parts, sum_parts, no_parsed = [], [], 0
+for reports in chunks:
+  # use a regex to extract the year from the date of report
+  reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
 
-# %% [markdown]
-# ### Counting the number of reports in each coroner area
+  # count the number of reports in each year
+  value_parts.append(reports.value_counts(['year', 'coroner_area']))
+  sum_parts.append(reports.value_counts(['coroner_area']))
+  no_parsed += reports.count()['coroner_area']
 
-# count the number of reports in each year
-value_counts = reports.value_counts(['year', 'coroner_area'])
+value_counts = merge_counts(value_parts)
 area_counts = value_counts.unstack(fill_value=0)
-sum_counts = reports.value_counts(['coroner_area'])
+sum_counts = merge_counts(sum_parts)
 
 # %% [markdown]
 # ### Various statistics about the counts
 
 toml_stats['coroner areas'] = statistics = {
-  "no. parsed reports": reports.count()['coroner_area'],
+  "no. parsed reports": no_parsed,
   "no. areas": len(sum_counts),
   "mean per area": round(sum_counts.mean(), 1),
+  f"mean per area {CI_NAME}": mean_ci(sum_counts),
   "median per area": sum_counts.median(),
+  f"median per area {CI_NAME}": median_ci(sum_counts),
   "IQR of areas": list(sum_counts.quantile([0.25, 0.75])),
+  f"IQR of areas {CI_NAME}": quantile_ci(sum_counts, [0.25, 0.75]),
 }
 
 print(f"Area count statistics: {statistics}")
@@ -8,26 +8,14 @@
 
 import os
 import json
-import pandas as pd
 
-from helpers import toml_stats
+from helpers import toml_stats, read_reports, merge_counts, CI_NAME, mean_ci, median_ci, quantile_ci
 
 PATH = os.path.dirname(__file__)
 DATA_PATH = os.path.abspath(f"{PATH}/data")
 REPORTS_PATH = os.path.abspath(f"{PATH}/../../data")
 CORRECT_PATH = os.path.abspath(f"{PATH}/../../correct")
 
-# %% [markdown]
-# ### Reading the reports
-
-reports = pd.read_csv(f"{REPORTS_PATH}/reports-analysed.csv")
-
-# %% [markdown]
-# ### Calculating the year of each report
-
-# use a regex to extract the year from the date of report
-reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
-
 # %% [markdown]
 # ### Fetching the categories
 
@@ -38,28 +26,48 @@ with open(f"{CORRECT_PATH}/manual_replace/categories.json", 'r', encoding='utf8'
 
   categories = list(set(categories))
 
+# %% [markdown]
+# ### Reading the reports
+
+chunks = read_reports(
+  f"{REPORTS_PATH}/reports-analysed.csv",
+  ['date_of_report', 'category']
+)
+
 # %% [markdown]
 # ### Creating columns for each entry
 
-exploded = reports.copy()
-exploded['category'] = reports['category'].str.split(r'\s*\|\s*')
-exploded = exploded.explode('category', ignore_index=True)
-exploded = exploded[exploded['category'].isin(categories)]
+year_parts, sum_parts, no_parsed = [], [], 0
+for reports in chunks:
+  # use a regex to extract the year from the date of report
+  reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
+
+  exploded = reports.copy()
+  exploded['category'] = reports['category'].str.split(r'\s*\|\s*')
+  exploded = exploded.explode('category', ignore_index=True)
+  exploded = exploded[exploded['category'].isin(categories)]
+
+  year_parts.append(exploded.value_counts(['year', 'category']))
+  sum_parts.append(exploded.value_counts(['category']))
+  no_parsed += reports.count()['category']
 
-category_counts = exploded.value_counts(['year', 'category']).unstack(fill_value=0)
+category_counts = merge_counts(year_parts).unstack(fill_value=0)
 
-sum_counts = exploded.value_counts(['category'])
+sum_counts = merge_counts(sum_parts)
 
 # %% [markdown]
 # ### Various statistics about the counts
 
 toml_stats['death categories'] = statistics = {
-  "no. reports parsed": reports.count()['category'],
+  "no. reports parsed": no_parsed,
   "no. categories in reports": sum_counts.sum(),
   "no. categories": len(sum_counts),
   "mean per category": round(sum_counts.mean(), 1),
+  f"mean per category {CI_NAME}": mean_ci(sum_counts),
   "median per category": sum_counts.median(),
+  f"median per category {CI_NAME}": median_ci(sum_counts),
   "IQR of categories": list(sum_counts.quantile([0.25, 0.75])),
+  f"IQR of categories {CI_NAME}": quantile_ci(sum_counts, [0.25, 0.75]),
 }
 
 print(f"Category count statistics: {statistics}")
@@ -0,0 +1,92 @@
+# %% [markdown]
+# ## Process
+# We count the number of reports tagged with each medical cause of death by the
+# natural language analysis, over each year and coroner area. We then save the
+# results to a .csv file.
+
+# %% [markdown]
+# ### Importing libraries
+
+import os
+import json
+import pyarrow.parquet as pq
+
+from helpers import toml_stats, read_reports, merge_counts, CI_NAME, mean_ci, median_ci, quantile_ci
+
+# only count the most likely cause(s) of death for each report
+MAX_RANK = 1
+
+PATH = os.path.dirname(__file__)
+DATA_PATH = os.path.abspath(f"{PATH}/data")
+REPORTS_PATH = os.path.abspath(f"{PATH}/../../data")
+TAGS_PATH = os.path.abspath(f"{PATH}/../natural-language/data")
+
+# %% [markdown]
+# ### Reading the tags
+# The tags are a long table of (report url, ref, cause id, score, rank), with
+# the names of the causes kept in the table's metadata. Tags are joined to the
+# reports by url, as refs can be missing or shared by several reports.
+
+table = pq.read_table(f"{TAGS_PATH}/medical-cause-tags.parquet")
+causes = json.loads(table.schema.metadata[b'causes'])
+
+tags = table.to_pandas().drop(columns='ref')
+tags = tags[tags['rank'] <= MAX_RANK]
+tags['cause'] = tags['cause_id'].map(dict(enumerate(causes)))
+
+# %% [markdown]
+# ### Reading the reports
+
+chunks = read_reports(
+  f"{REPORTS_PATH}/reports-analysed.csv",
+  ['report_url', 'date_of_report', 'coroner_area']
+)
+
+# %% [markdown]
+# ### Joining the tags to the reports
+
+year_parts, area_parts, sum_parts, no_tagged = [], [], [], 0
+seen_urls = set()
+for reports in chunks:
+  # use a regex to extract the year from the date of report
+  reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
+
+  # only join each tag to the first report with its url
+  reports = reports.dropna(subset='report_url').drop_duplicates('report_url')
+  reports = reports[~reports['report_url'].isin(seen_urls)]
+  seen_urls.update(reports['report_url'])
+
+  tagged = tags.merge(reports, on='report_url')
+  year_parts.append(tagged.value_counts(['year', 'cause']))
+  area_parts.append(tagged.value_counts(['coroner_area', 'cause']))
+  sum_parts.append(tagged.value_counts(['cause']))
+  no_tagged += tagged['report_url'].nunique()
+
+cause_years = merge_counts(year_parts).unstack(fill_value=0)
+cause_areas = merge_counts(area_parts).unstack(fill_value=0)
+sum_counts = merge_counts(sum_parts)
+
+# %% [markdown]
+# ### Various statistics about the counts
+
+toml_stats['medical causes'] = statistics = {
+  "no. reports tagged": no_tagged,
+  "no. causes": len(sum_counts),
+  "mean per cause": round(sum_counts.mean(), 1),
+  f"mean per cause {CI_NAME}": mean_ci(sum_counts),
+  "median per cause": sum_counts.median(),
+  f"median per cause {CI_NAME}": median_ci(sum_counts),
+  "IQR of causes": list(sum_counts.quantile([0.25, 0.75])),
+  f"IQR of causes {CI_NAME}": quantile_ci(sum_counts, [0.25, 0.75]),
+}
+
+print(f"Cause count statistics: {statistics}")
+print(f"Sorted counts: {sum_counts}")
+
+# %% [markdown]
+# ### Saving the results
+
+os.makedirs(f"{DATA_PATH}/cause", exist_ok=True)
+cause_years.to_csv(f"{DATA_PATH}/cause/cause-years.csv")
+cause_areas.to_csv(f"{DATA_PATH}/cause/cause-areas.csv")
+sum_counts.to_csv(f"{DATA_PATH}/cause/cause-counts.csv")
@@ -1,9 +1,37 @@
+# %% [markdown]
+# ### Parsing arguments
+# Without a memory budget, each analysis reads all the reports at once
+
+import argparse
+
+parser = argparse.ArgumentParser(
+  description="Run all the count analyses on the reports",
+  formatter_class=argparse.ArgumentDefaultsHelpFormatter
+)
+parser.add_argument(
+  "-m", "--memory-budget", type=float,
+  nargs="?", default=None,
+  help="The memory (in MB) to stream the reports within"
+)
+parser.add_argument(
+  "--statuses-csv", action="store_true",
+  help="Also write the status of each request to sent/statuses.csv"
+)
+
+args = parser.parse_args()
+
 # %% [markdown]
 # ### Importing libraries
 
+import os
 import sys
 sys.path.append(".")
 
+if args.memory_budget is not None:
+  os.environ['COUNTS_MEMORY_BUDGET'] = str(args.memory_budget)
+if args.statuses_csv:
+  os.environ['COUNTS_STATUSES_CSV'] = '1'
+
 import shutil
 shutil.copyfile(
   "src/data/reports-corrected.csv",
@@ -14,6 +42,7 @@ shutil.copyfile(
 # ### Running the counts
 
 import area_counts as _
+import cause_counts as _
 import category_counts as _
 import gender_counts as _
 import name_counts as _
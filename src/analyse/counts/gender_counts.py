@@ -10,7 +10,7 @@ import os
 import json
 import pandas as pd
 
-from helpers import toml_stats, percent
+from helpers import toml_stats, percent, read_reports, merge_counts, CI_NAME, percent_ci
 
 PATH = os.path.dirname(__file__)
 DATA_PATH = os.path.abspath(f"{PATH}/data")
@@ -29,11 +29,6 @@ FEMALE_NAME = rf"^.*{FEMALE_NAME}.*$"
 REPLACEMENTS = {MALE_NAME: 'male', FEMALE_NAME: 'female', UNKNOWN_NAME: 'unknown'}
 print(REPLACEMENTS)
 
-# %% [markdown]
-# ### Reading the reports
-
-reports = pd.read_csv(f"{REPORTS_PATH}/reports-analysed.csv")
-
 # %% [markdown]
 # ### Reading coroner names
 
@@ -44,27 +39,43 @@ website_genders = pd.Series(coroner_names).str.lower().replace(regex=REPLACEMENT
 website_counts = website_genders.value_counts()
 
 # %% [markdown]
-# ### Calculating the year of each report
+# ### Reading the reports
 
-# use a regex to extract the year from the date of report
-reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
+chunks = read_reports(
+  f"{REPORTS_PATH}/reports-analysed.csv",
+  ['date_of_report', 'coroner_name']
+)
 
 # %% [markdown]
-# ### Counting the number of reports in each coroner area
+# ### Counting the number of reports for each gender
+
+year_parts, sum_parts = [], []
+for reports in chunks:
+  # use a regex to extract the year from the date of report
+  reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
 
-# count the number of reports in each year
-reports['gender'] = reports['coroner_name'].str.lower().replace(regex=REPLACEMENTS)
-gender_counts = reports.value_counts(['year', 'gender']).unstack(fill_value=0)
-sum_counts = reports.value_counts('gender')
+  # count the number of reports in each year
+  reports['gender'] = reports['coroner_name'].str.lower().replace(regex=REPLACEMENTS)
+  year_parts.append(reports.value_counts(['year', 'gender']))
+  sum_parts.append(reports.value_counts('gender'))
+
+gender_counts = merge_counts(year_parts).unstack(fill_value=0)
+sum_counts = merge_counts(sum_parts)
 
 # %% [markdown]
 # ### Various statistics about the counts
 
+GENDERS = ['male', 'female', 'unknown']
+report_cis = dict(zip(GENDERS, percent_ci(sum_counts[GENDERS], sum_counts.sum())))
+
 toml_stats['coroners in reports'] = statistics = dict(
   toml_stats['coroners in reports'], **{
   "reports from male coroners": [float(sum_counts['male']), percent(sum_counts['male'], sum_counts.sum())],
   "reports from female coroners": [float(sum_counts['female']), percent(sum_counts['female'], sum_counts.sum())],
   "reports from unknown coroners": [float(sum_counts['unknown']), percent(sum_counts['unknown'], sum_counts.sum())],
+  f"reports from male coroners {CI_NAME}": report_cis['male'],
+  f"reports from female coroners {CI_NAME}": report_cis['female'],
+  f"reports from unknown coroners {CI_NAME}": report_cis['unknown'],
 })
 
 toml_stats["coroners' society"] = dict(
@@ -1,9 +1,166 @@
 import os
 import toml
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 def percent(n, total):
   return round(n / total * 100, 1)
 
+# Confidence intervals for the statistics are found by bootstrapping: all the
+# resamples are drawn at once as a (resamples x values) index matrix from a
+# fixed seed, so the intervals are the same on every run over the same reports.
+# Percentages are bootstrapped from their binomial distribution instead, as an
+# index matrix over every report or request would break the memory budget.
+
+BOOTSTRAP_SEED = 0
+BOOTSTRAP_RESAMPLES = 2000
+CI_LEVEL = 0.95
+CI_NAME = f"{CI_LEVEL:.0%} CI"
+
+def resample_indices(n):
+  """The indices of every bootstrap resample of `n` values."""
+  rng = np.random.default_rng(BOOTSTRAP_SEED)
+  return rng.integers(0, n, (BOOTSTRAP_RESAMPLES, n), dtype=np.int32)
+
+def resample(values):
+  """Every bootstrap resample of `values`, one resample per row."""
+  values = np.asarray(values, dtype=float)
+  return values[resample_indices(len(values))]
+
+def interval(replicates):
+  """The percentile interval of the bootstrapped replicates of a statistic."""
+  tail = (1 - CI_LEVEL) / 2
+  return np.quantile(replicates, [tail, 1 - tail], axis=0).round(1).T.tolist()
+
+def mean_ci(values):
+  return interval(resample(values).mean(axis=1))
+
+def median_ci(values):
+  return interval(np.median(resample(values), axis=1))
+
+def quantile_ci(values, quantiles):
+  """An interval for each quantile of `values`."""
+  return interval(np.quantile(resample(values), quantiles, axis=1).T)
+
+def percent_ci(counts, total):
+  """
+  An interval for the percentage of `total` items each count makes up.
+  Resampling the items only changes how many of them are counted, which is
+  binomially distributed, so this is drawn directly rather than resampled.
+  """
+  rng = np.random.default_rng(BOOTSTRAP_SEED)
+  return [
+    interval(rng.binomial(int(total), n / total, BOOTSTRAP_RESAMPLES) / total * 100)
+    for n in counts
+  ]
+
+# When a memory budget (in MB) is given, the reports are read in chunks sized to
+# fit within it and the counts for each chunk are merged at the end. Otherwise
+# all the reports are read as a single chunk.
+
+MEMORY_BUDGET = os.environ.get('COUNTS_MEMORY_BUDGET')
+MEMORY_BUDGET = float(MEMORY_BUDGET) if MEMORY_BUDGET else None
+
+# the rough no. copies of each row made whilst counting (i.e. by explodes)
+CHUNK_OVERHEAD = 8
+MIN_CHUNK_ROWS = 100
+SAMPLE_ROWS = 500
+
+# columns added by the analyses that aren't read as text
+COUNT_COLUMNS = ['no. recipients', 'no. replies']
+
+def _read_options(path, columns):
+  header = list(pd.read_csv(path, nrows=0).columns)
+  columns = header if columns is None else [col for col in header if col in columns]
+  dtype = {col: str for col in columns if col not in COUNT_COLUMNS}
+  return {"usecols": columns, "dtype": dtype}
+
+def chunk_rows(path, columns=None):
+  """The no. rows of the reports to read at once to stay within the memory budget."""
+  if MEMORY_BUDGET is None:
+    return None
+
+  sample = pd.read_csv(path, nrows=SAMPLE_ROWS, **_read_options(path, columns))
+  row_bytes = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+  return max(MIN_CHUNK_ROWS, int(MEMORY_BUDGET * 2**20 / (row_bytes * CHUNK_OVERHEAD)))
+
+def read_reports(path, columns=None, rows=None):
+  """Yields the given columns of the reports in chunks of `rows` rows."""
+  options = _read_options(path, columns)
+  rows = rows or chunk_rows(path, columns)
+  if rows is None:
+    yield pd.read_csv(path, **options)
+  else:
+    yield from pd.read_csv(path, chunksize=rows, **options)
+
+def merge_counts(counts):
+  """Merges the value counts of each chunk, sorted as `value_counts` would be."""
+  merged = pd.concat(counts)
+  index = merged.index
+  levels = list(range(index.nlevels))
+  merged = merged.groupby(level=levels).sum().sort_values(ascending=False)
+  if not isinstance(index, pd.MultiIndex):
+    return merged
+
+  # value_counts keeps every value of a column in the index levels, even those
+  # dropped with missing values, which changes the row order of `unstack`
+  levels = [
+    pd.Index(sorted(set().union(*(count.index.levels[i] for count in counts))), name=name)
+    for i, name in enumerate(index.names)
+  ]
+  merged.index = pd.MultiIndex(
+    levels=levels,
+    codes=[level.get_indexer(merged.index.get_level_values(i)) for i, level in enumerate(levels)],
+    names=index.names
+  )
+  return merged
+
+def merge_sums(sums):
+  """Merges the grouped sums of each chunk."""
+  return pd.concat(sums).groupby(level=0).sum()
+
+class ChunkWriter:
+  """Writes a .csv file a chunk at a time, only replacing the file once done."""
+  def __init__(self, path):
+    self.path = path
+    self.temp_path = f"{path}.tmp"
+    self.header = True
+
+  def __enter__(self):
+    return self
+
+  def write(self, chunk):
+    mode = 'w' if self.header else 'a'
+    chunk.to_csv(self.temp_path, mode=mode, header=self.header, index=False)
+    self.header = False
+
+  def __exit__(self, exc_type, *_):
+    if exc_type is None and not self.header:
+      os.replace(self.temp_path, self.path)
+    elif os.path.exists(self.temp_path):
+      os.remove(self.temp_path)
+
+class ParquetChunkWriter(ChunkWriter):
+  """Writes a compressed .parquet file a chunk at a time, with a fixed schema."""
+  def __init__(self, path, schema):
+    super().__init__(path)
+    self.schema = schema
+    self.writer = None
+
+  def write(self, chunk):
+    if self.writer is None:
+      self.writer = pq.ParquetWriter(self.temp_path, self.schema, compression='zstd')
+    self.writer.write_table(pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False))
+    self.header = False
+
+  def __exit__(self, exc_type, *rest):
+    if self.writer is not None:
+      self.writer.close()
+    super().__exit__(exc_type, *rest)
+
+
 class TOMLCache:
   """A TOML cache that keeps a toml file up to date with its contents."""
   def __init__(self, path, encoder = toml.TomlEncoder):
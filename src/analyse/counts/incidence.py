@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+class Incidence:
+  """
+  A sparse report x item incidence matrix (i.e. reports x recipients), stored
+  in CSR form: the items of report `i` are `ids[indptr[i]:indptr[i + 1]]`,
+  which index into the interned item names in `items`.
+
+  Per item tables are calculated as products of the transposed matrix with
+  per report values, so the reports never need to be exploded.
+  """
+  def __init__(self, lists, name='item'):
+    lists = list(lists)
+    lengths = np.array([len(x) if isinstance(x, list) else 0 for x in lists], dtype=np.int64)
+    self.name = name
+    self.indptr = np.concatenate([[0], np.cumsum(lengths)])
+    self.rows = np.repeat(np.arange(len(lists)), lengths)
+
+    flat = pd.Series([item for x in lists if isinstance(x, list) for item in x], dtype=object)
+    ids, items = pd.factorize(flat, sort=True)
+    self.ids = ids.astype(np.int64)
+    self.items = pd.Index(items, dtype=object, name=name)
+
+  @property
+  def lengths(self):
+    """The no. items for each report."""
+    return np.diff(self.indptr)
+
+  @property
+  def names(self):
+    """The name of the item in each (report, item) pair."""
+    return self.items.values[self.ids]
+
+  def pairs(self, values):
+    """Repeats a per report value for each of the report's items."""
+    return np.asarray(values)[self.rows]
+
+  def map(self, func):
+    """Renames each item, merging any items that end up with the same name."""
+    mapped = self._copy()
+    ids, items = pd.factorize(pd.Series([func(item) for item in self.items], dtype=object), sort=True)
+    mapped.ids = ids.astype(np.int64)[self.ids]
+    mapped.items = pd.Index(items, dtype=object, name=self.name)
+    return mapped
+
+  def _copy(self):
+    copy = object.__new__(Incidence)
+    copy.__dict__.update(self.__dict__)
+    return copy
+
+  def counts(self):
+    """The no. reports for each item, as `value_counts` would give them."""
+    counts = pd.Series(np.bincount(self.ids, minlength=len(self.items)), index=self.items, name='count')
+    return counts.sort_values(ascending=False)
+
+  def sums(self, frame):
+    """The sum of each column of `frame` over the reports of each item."""
+    return pd.DataFrame({
+      column: np.bincount(
+        self.ids, weights=self.pairs(frame[column]), minlength=len(self.items)
+      ).astype(frame[column].dtype)
+      for column in frame.columns
+    }, index=self.items)
+
+  def value_counts(self, values, name, levels=None):
+    """
+    The no. times each item occurs with each of the values given for each
+    (report, item) pair, as `value_counts` on the exploded reports would give.
+    """
+    values = pd.Series(values)
+    levels = values.dropna().unique() if levels is None else pd.Series(levels).dropna().unique()
+    levels = pd.Index(sorted(levels), name=name)
+    return self._product(levels.get_indexer(values), levels)
+
+  def cross(self, other):
+    """The no. reports each item of this matrix shares with each of `other`."""
+    # each (report, item) pair is repeated for every item of `other` in the report
+    repeats = other.lengths[self.rows]
+    ids = np.repeat(self.ids, repeats)
+    starts = np.repeat(other.indptr[self.rows], repeats)
+    offsets = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    return self._product(other.ids[starts + offsets], other.items, ids)
+
+  def _product(self, codes, levels, ids=None):
+    ids = self.ids if ids is None else ids
+    valid = codes >= 0
+    matrix = np.bincount(
+      ids[valid] * len(levels) + codes[valid],
+      minlength=len(self.items) * len(levels)
+    ).reshape(len(self.items), len(levels))
+
+    # only keep non-zero counts, in sorted key order as `value_counts` does
+    item_codes, level_codes = np.nonzero(matrix)
+    index = pd.MultiIndex(
+      levels=[self.items, levels], codes=[item_codes, level_codes],
+      names=[self.name, levels.name]
+    )
+    counts = pd.Series(matrix[item_codes, level_codes], index=index, name='count')
+    return counts.sort_values(ascending=False)
+
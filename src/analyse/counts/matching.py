@@ -0,0 +1,186 @@
+import os
+import re
+import json
+import hashlib
+import unicodedata
+from collections import defaultdict
+
+NON_WORDS = re.compile(r"[\W_]+")
+TITLES = re.compile(r"\b(?:mr|mrs|miss|ms|mx|dr|sir|lady|dame|hhj|judge|qc|kc)\b")
+
+def normalise(text):
+  """Lowercases text, strips accents and collapses punctuation into spaces."""
+  text = unicodedata.normalize('NFKD', str(text))
+  text = text.encode('ascii', 'ignore').decode('ascii').lower()
+  return NON_WORDS.sub(' ', text).strip()
+
+def normalise_name(name):
+  """Normalises a person's name, dropping any titles (Mr, Dr, HHJ, etc)."""
+  return ' '.join(TITLES.sub(' ', normalise(name)).split())
+
+def edit_distance(str1, str2, max_dist):
+  """
+  Returns the Levenshtein distance between two strings, or `max_dist + 1` if
+  the distance is larger than `max_dist`.
+  Only a band of width `2 * max_dist + 1` around the diagonal is calculated.
+  """
+  if abs(len(str1) - len(str2)) > max_dist:
+    return max_dist + 1
+  if len(str1) > len(str2):
+    str1, str2 = str2, str1
+
+  over = max_dist + 1
+  prev = [j if j <= max_dist else over for j in range(len(str2) + 1)]
+  for i in range(1, len(str1) + 1):
+    lo, hi = max(1, i - max_dist), min(len(str2), i + max_dist)
+    curr = [over] * (len(str2) + 1)
+    curr[0] = i if i <= max_dist else over
+    for j in range(lo, hi + 1):
+      cost = prev[j - 1] + (str1[i - 1] != str2[j - 1])
+      curr[j] = min(cost, prev[j] + 1, curr[j - 1] + 1, over)
+    if min(curr[lo - 1:hi + 1]) > max_dist:
+      return over
+    prev = curr
+
+  return prev[-1]
+
+class MatchIndex:
+  """
+  An approximate lookup from query strings to a list of reference strings.
+
+  References are stored under a normalised key, with an inverted index from
+  character n-grams to the keys containing them. A query is only compared
+  against the keys that share enough n-grams with it to possibly be within the
+  edit distance bound, rather than against every reference.
+
+  The bound is `max_ratio` of the query's length, capped at `max_edits`. With
+  `max_word_edits`, a match must also have the same no. words as the query,
+  each within `max_word_edits` edits (and a quarter of the word's length), so
+  that names differing by a whole word are never matched.
+  """
+  def __init__(
+    self, references, n=3, max_ratio=0.2, max_edits=None, max_word_edits=None,
+    normalise=normalise, cache_path=None
+  ):
+    # references can be a list of names or a mapping of alias -> canonical name
+    if not isinstance(references, dict):
+      references = {ref: ref for ref in references}
+
+    self.n = n
+    self.max_ratio = max_ratio
+    self.max_edits = max_edits
+    self.max_word_edits = max_word_edits
+    self.normalise = normalise
+    self.keys = {}
+    for alias, value in references.items():
+      key = self.normalise(alias)
+      if key:
+        self.keys.setdefault(key, value)
+
+    self.grams = defaultdict(set)
+    for key in self.keys:
+      for gram in self._grams(key):
+        self.grams[gram].add(key)
+
+    self.cache_path = cache_path
+    self.matches = {}
+    self.queried = set()
+    self.changed = False
+    self._read()
+
+  def _grams(self, key):
+    padded = f" {key} "
+    return {padded[i:i + self.n] for i in range(max(1, len(padded) - self.n + 1))}
+
+  def _fingerprint(self):
+    contents = json.dumps([
+      self.n, self.max_ratio, self.max_edits, self.max_word_edits,
+      sorted(self.keys.items())
+    ])
+    return hashlib.sha1(contents.encode('utf8')).hexdigest()
+
+  def _read(self):
+    if self.cache_path is None or not os.path.exists(self.cache_path):
+      return
+    with open(self.cache_path, 'r', encoding='utf8') as rf:
+      cache = json.load(rf)
+    # the cache is only valid for the references it was built from
+    if cache.get('fingerprint') == self._fingerprint():
+      self.matches = cache['matches']
+
+  def save(self):
+    """Writes any new matches to the cache."""
+    if self.cache_path is None or not self.changed:
+      return
+    os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+    with open(self.cache_path, 'w', encoding='utf8') as wf:
+      json.dump({'fingerprint': self._fingerprint(), 'matches': self.matches}, wf)
+    self.changed = False
+
+  def _words_match(self, key, candidate):
+    words, others = key.split(), candidate.split()
+    if len(words) != len(others):
+      return False
+    for word, other in zip(words, others):
+      max_dist = min(self.max_word_edits, len(word) // 4)
+      if edit_distance(word, other, max_dist) > max_dist:
+        return False
+    return True
+
+  def _lookup(self, query):
+    key = self.normalise(query)
+    if not key:
+      return None
+    if key in self.keys:
+      return self.keys[key]
+
+    max_dist = int(len(key) * self.max_ratio)
+    if self.max_edits is not None:
+      max_dist = min(max_dist, self.max_edits)
+    if max_dist == 0:
+      return None
+
+    # count the n-grams each reference shares with the query
+    grams = self._grams(key)
+    shared = defaultdict(int)
+    for gram in grams:
+      for candidate in self.grams.get(gram, ()):
+        shared[candidate] += 1
+
+    # each edit can destroy at most n of the query's n-grams
+    min_shared = len(grams) - max_dist * self.n
+    candidates = sorted(
+      (candidate for candidate, count in shared.items() if count >= min_shared),
+      key=lambda candidate: (-shared[candidate], candidate)
+    )
+
+    best, best_dist = None, max_dist + 1
+    for candidate in candidates:
+      if self.max_word_edits is not None and not self._words_match(key, candidate):
+        continue
+      dist = edit_distance(key, candidate, best_dist - 1)
+      if dist < best_dist:
+        best, best_dist = candidate, dist
+
+    return None if best is None else self.keys[best]
+
+  def __getitem__(self, query):
+    """Returns the closest reference to the query, or None if there is none."""
+    query = str(query)
+    if query not in self.matches:
+      self.matches[query] = self._lookup(query)
+      self.changed = True
+    return self.matches[query]
+
+  def remaps(self):
+    """The queries resolved so far that were matched to a different reference."""
+    return {
+      query: self.matches[query] for query in sorted(self.queried)
+      if self.matches[query] is not None and self.normalise(query) not in self.keys
+    }
+
+  def resolve(self, queries):
+    """Resolves each unique query, returning a mapping of query -> reference."""
+    queries = set(str(query) for query in queries)
+    self.queried.update(queries)
+    return {query: self[query] for query in queries}
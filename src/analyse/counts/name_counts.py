@@ -10,7 +10,9 @@ import os
 import json
 import pandas as pd
 
-from helpers import toml_stats, percent
+from helpers import toml_stats, percent, read_reports, merge_counts, ChunkWriter, \
+  CI_NAME, mean_ci, median_ci, quantile_ci, percent_ci
+from matching import MatchIndex, normalise_name
 
 TOP_N = 30
 
@@ -18,11 +20,7 @@ PATH = os.path.dirname(__file__)
 DATA_PATH = os.path.abspath(f"{PATH}/data")
 REPORTS_PATH = os.path.abspath(f"{PATH}/../../data")
 CORRECTION_PATH = os.path.abspath(f"{PATH}/../../correct/data")
-
-# %% [markdown]
-# ### Reading the reports
-
-reports = pd.read_csv(f"{REPORTS_PATH}/reports-analysed.csv")
+CACHE_PATH = os.path.abspath(f"{PATH}/data/cache")
 
 # %% [markdown]
 # ### Reading coroner names
@@ -34,7 +32,26 @@ with open(f"{CORRECTION_PATH}/fetched_names.json", 'r', encoding="utf8") as rf:
 # ### Reading the coroner data
 
 coroner_data = pd.read_csv(f"{REPORTS_PATH}/coroners-society.csv")
-coroner_titles = {row['name']: row['title'] for _, row in coroner_data.iterrows()}
+coroner_titles = dict(zip(coroner_data['name'], coroner_data['title']))
+
+# %% [markdown]
+# ### Matching the names in reports to the coroner data
+# Names in reports don't always exactly match those in the coroner data, so we
+# match each unique name to the closest coroner within a small edit distance.
+
+name_index = MatchIndex(
+  coroner_titles.keys(), normalise=normalise_name,
+  cache_path=f"{CACHE_PATH}/coroner-names.json"
+)
+report_titles = {}
+
+def match_titles(names):
+  '''Adds the titles of the closest coroners to the given names.'''
+  name_matches = name_index.resolve(names.dropna())
+  report_titles.update({
+    name: coroner_titles[match]
+    for name, match in name_matches.items() if match is not None
+  })
 
 # %% [markdown]
 # ### Calculating the titles of coroner in each area
@@ -53,28 +70,36 @@ area_counts = coroner_area[is_area]\
 # %% [markdown]
 # ### Adding coroner titles to the reports
 
-report_columns = list(reports.columns)
-reports['coroner_title'] = reports['coroner_name'].map(coroner_titles)
+name_parts, sum_parts, title_parts, no_parsed = [], [], [], 0
+with ChunkWriter(f"{REPORTS_PATH}/reports-analysed.csv") as writer:
+  for reports in read_reports(f"{REPORTS_PATH}/reports-analysed.csv"):
+    match_titles(reports['coroner_name'])
 
-title_idx = report_columns.index('coroner_name')  + 1
-report_columns.insert(title_idx, 'coroner_title')
-report_columns = list(dict.fromkeys(report_columns))
+    report_columns = list(reports.columns)
+    reports['coroner_title'] = reports['coroner_name'].map(report_titles)
 
-reports[report_columns].to_csv(f"{REPORTS_PATH}/reports-analysed.csv", index=False)
+    title_idx = report_columns.index('coroner_name')  + 1
+    report_columns.insert(title_idx, 'coroner_title')
+    report_columns = list(dict.fromkeys(report_columns))
 
-# %% [markdown]
-# ### Calculating the year of each report
+    writer.write(reports[report_columns])
+
+    # use a regex to extract the year from the date of report
+    reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
 
-# use a regex to extract the year from the date of report
-reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
+    # count the number of reports in each year
+    name_parts.append(reports.value_counts(['year', 'coroner_name']))
+    sum_parts.append(reports.value_counts('coroner_name'))
+    title_parts.append(reports.value_counts('coroner_title'))
+    no_parsed += reports.count()['coroner_name']
+
+name_index.save()
 
 # %% [markdown]
 # ### Counting the number of reports in each coroner area
 
-# count the number of reports in each year
-
-name_counts = reports.value_counts(['year', 'coroner_name']).unstack(fill_value=0)
-sum_counts = reports.value_counts('coroner_name')
+name_counts = merge_counts(name_parts).unstack(fill_value=0)
+sum_counts = merge_counts(sum_parts)
 
 # %% [markdown]
 # ### Calculating the top coroners
@@ -87,7 +112,7 @@ top_years = name_counts[top_names]
 # ### Calculating the top coroner titles
 
 top_categorised = pd.DataFrame({"count": top_counts})
-top_name_titles = top_counts.index.map(coroner_titles).fillna('Unknown')
+top_name_titles = top_counts.index.map(report_titles).fillna('Unknown')
 
 for title in top_name_titles.unique():
   top_categorised[title] = top_categorised["count"].where(top_name_titles == title, 0)
@@ -95,9 +120,9 @@ for title in top_name_titles.unique():
 # %% [markdown]
 # ### Calculating counts for titles
 
-sum_titles = reports.value_counts('coroner_title')
+sum_titles = merge_counts(title_parts)
 top_titles = top_counts.copy()
-top_titles.index = top_titles.index.map(coroner_titles).rename('coroner_title')
+top_titles.index = top_titles.index.map(report_titles).rename('coroner_title')
 top_titles = top_titles.groupby(level=0).sum()
 
 # %% [markdown]
@@ -105,12 +130,16 @@ top_titles = top_titles.groupby(level=0).sum()
 
 toml_stats["coroners in reports"] = statistics = dict(
   toml_stats["coroners in reports"], **{
-  "no. reports parsed": reports.count()['coroner_name'],
+  "no. reports parsed": no_parsed,
   "no. coroner names in reports": len(sum_counts),
   f"reports from top {TOP_N} names": [float(top_counts.sum()), percent(top_counts.sum(), sum_counts.sum())],
+  f"reports from top {TOP_N} names {CI_NAME}": percent_ci([top_counts.sum()], sum_counts.sum())[0],
   "mean per name": round(sum_counts.mean(), 1),
+  f"mean per name {CI_NAME}": mean_ci(sum_counts),
   "median per name": sum_counts.median(),
+  f"median per name {CI_NAME}": median_ci(sum_counts),
   "IQR of names": list(sum_counts.quantile([0.25, 0.75])),
+  f"IQR of names {CI_NAME}": quantile_ci(sum_counts, [0.25, 0.75]),
 })
 
 with_reports = len([name for name in coroner_names if name in sum_counts.index])
@@ -8,147 +8,287 @@
 
 import os
 import re
+import json
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from collections import defaultdict
+from contextlib import nullcontext
 
-from helpers import toml_stats, percent
+from helpers import toml_stats, percent, read_reports, chunk_rows, merge_counts, merge_sums, ChunkWriter, ParquetChunkWriter, \
+  CI_NAME, mean_ci, median_ci, quantile_ci, percent_ci
+from matching import MatchIndex
+from incidence import Incidence
 
 TOP_N = 30
 
+# whether to also write the statuses of each request as a .csv file
+STATUSES_CSV = bool(os.environ.get('COUNTS_STATUSES_CSV'))
+STATUS_SCHEMA = pa.schema([
+  ('report_url', pa.string()),
+  ('ref', pa.string()),
+  ('recipient_id', pa.int32()),
+  ('status', pa.string()),
+  ('year', pa.int16()),
+])
+
 PATH = os.path.dirname(__file__)
 DATA_PATH = os.path.abspath(f"{PATH}/data")
 REPORTS_PATH = os.path.abspath(f"{PATH}/../../data")
 CORRECT_PATH = os.path.abspath(f"{PATH}/../../correct")
+CACHE_PATH = os.path.abspath(f"{PATH}/data/cache")
 
 # %% [markdown]
 # ### Reading the reports
+# The reports and fetched reports are read in chunks of the same rows, so that
+# each report lines up with its fetched report.
 
-reports = pd.read_csv(f"{REPORTS_PATH}/reports-analysed.csv")
-fetched = pd.read_csv(f"{REPORTS_PATH}/reports.csv")
+rows = chunk_rows(f"{REPORTS_PATH}/reports-analysed.csv")
+chunks = zip(
+  read_reports(f"{REPORTS_PATH}/reports-analysed.csv", rows=rows),
+  read_reports(f"{REPORTS_PATH}/reports.csv", ['this_report_is_being_sent_to'], rows=rows)
+)
 
-fetched_non_na = fetched.dropna(subset=['this_report_is_being_sent_to'])
+today = pd.to_datetime('today')
+vbar = re.compile(r'\s*\|\s*')
+entity = re.compile(r'&#?\w+;')
 
 # %% [markdown]
-# ### Calculating the due status for each report
+# ### Matching recipients to known destinations
+# Slightly different spellings of the same recipient would otherwise have their
+# counts split, so we match each recipient to the closest known destination.
+# Many recipients only differ by a word or two (i.e. "Dorset County Council" and
+# "Somerset County Council"), so only a couple of edits are allowed, to each word.
+
+with open(f"{CORRECT_PATH}/data/known_destinations.json", 'r', encoding='utf8') as rf:
+  known_destinations = json.load(rf)
+
+rcpt_index = MatchIndex(
+  known_destinations, max_edits=2, max_word_edits=1,
+  cache_path=f"{CACHE_PATH}/recipients.json"
+)
 
-today = pd.to_datetime('today')
-report_date = pd.to_datetime(reports['date_of_report'], dayfirst=True)
-report_due = (today - report_date).dt.days > 56
+def split_recipients(sent_to):
+  '''
+  Splits the recipients of each report, which are separated by "|" or
+  sometimes ";" (i.e. "MOJ; Home Office"), keeping html entities like "&amp;"
+  whole. Combined recipients would otherwise be matched to just one of them.
+  '''
+  sent_to = sent_to.str.replace(entity, lambda m: m.group().replace(';', '\0'), regex=True)
+  return sent_to.str.split(r'\s*[|;]\s*').apply(
+    lambda rcpts: [rcpt.replace('\0', ';') for rcpt in rcpts if rcpt]
+      if isinstance(rcpts, list) else rcpts
+  )
+
+def match_recipients(recipients):
+  '''Renames each recipient to its closest known destination, if it has one.'''
+  matches = rcpt_index.resolve(recipients.items)
+  return recipients.map(lambda rcpt: matches.get(rcpt) or rcpt)
 
 # %% [markdown]
-# ### Splitting the sent to and reply urls
+# ### Numbering the recipients
+# Recipients keep the ids they were given in earlier runs, so that new reports
+# (added at the top of the reports) don't renumber them. Recipients not seen
+# before are numbered after these, in the order they're first sent a report.
+
+recipients_path = f"{DATA_PATH}/sent/recipients.parquet"
+recipient_ids = {}
+if os.path.exists(recipients_path):
+  known_recipients = pd.read_parquet(recipients_path)
+  recipient_ids = dict(zip(known_recipients['recipient'], known_recipients['recipient_id']))
+
+def number_recipients(names):
+  '''The id of each recipient, numbering any recipients not seen before.'''
+  for name in pd.unique(names):
+    recipient_ids.setdefault(name, len(recipient_ids))
+  return np.array([recipient_ids[name] for name in names], dtype=np.int32)
 
-vbar = re.compile(r'\s*\|\s*')
-non_na = reports.assign(year=report_date.dt.year).dropna(subset=['this_report_is_being_sent_to']).copy()
-non_na['status'] = 'overdue'
-non_na['sent_to'] =  non_na['this_report_is_being_sent_to'].str.split(vbar)
-non_na['no. recipients'] = non_na['sent_to'].str.len()
+# %% [markdown]
+# ### Fetching the categories
 
-non_na['replies'] = non_na['reply_urls'].fillna('').str.split(vbar).apply(lambda replies: [reply for reply in replies if "Response" in reply])
-non_na['no. replies'] = non_na['replies'].str.len()
+with open(f"{CORRECT_PATH}/manual_replace/categories.json", 'r', encoding='utf8') as f:
+  categories = []
+  for category in json.load(f):
+    categories.extend(category.values())
 
-non_na['escaped_urls'] = non_na['reply_urls'].str.replace(r'[-_]|%20', ' ', regex=True).fillna('')
+  categories = set(categories)
 
 # %% [markdown]
-# ### Status based on no. recipients vs replies
-
-equal_replies = non_na.apply(lambda x: len(x['sent_to']) == len(x['replies']) and len(x['sent_to']) > 0, axis=1)
-non_na.loc[equal_replies, 'status'] = 'received'
-non_na.loc[~report_due, 'status'] = 'pending'
+# ### Calculating the statuses in each chunk
+# Rather than exploding the reports for each recipient, we intern the
+# recipients of each report into a sparse report x recipient matrix. All
+# counts over recipients are then products of this with per report values.
+
+def count_statuses(reports, fetched):
+  '''
+  Calculates the response status of each report and request in a chunk,
+  returning the counts for the chunk, the reports with their statuses and
+  the status of each request.
+  '''
+  counts = {}
+
+  # calculating the due status for each report
+  report_date = pd.to_datetime(reports['date_of_report'], dayfirst=True)
+  report_due = ((today - report_date).dt.days > 56).values
+  year = report_date.dt.year.values
+
+  # splitting the sent to and reply urls
+  has_recipients = reports['this_report_is_being_sent_to'].notna().values
+  sent_to = Incidence(split_recipients(reports['this_report_is_being_sent_to']), 'sent_to')
+  no_recipients = sent_to.lengths
+
+  replies = reports['reply_urls'].fillna('').str.split(vbar)
+  no_replies = replies.apply(lambda replies: sum("Response" in reply for reply in replies)).values
+  escaped_urls = reports['reply_urls'].str.replace(r'[-_]|%20', ' ', regex=True).fillna('')
+
+  # status based on no. recipients vs replies
+  equal_replies = (no_recipients == no_replies) & (no_recipients > 0)
+  status = np.where(equal_replies, 'received', 'overdue')
+  status = np.where(report_due, status, 'pending')
+
+  # status based on recipients in replies
+  responded = np.array([
+    rcpt in urls for rcpt, urls in zip(sent_to.names, sent_to.pairs(escaped_urls))
+  ], dtype=bool)
+  request_status = np.where(responded, 'received', sent_to.pairs(status))
+  no_responses = np.bincount(sent_to.rows[responded], minlength=len(reports))
+  sent_to = match_recipients(sent_to)
+
+  # calculating the status of each report
+  response_status = np.full(len(reports), 'partial', dtype=object)
+
+  # if there's none, mark overdue
+  response_status[no_responses == 0] = 'overdue'
+
+  # if there's an equal number of recipients and replies, mark completed
+  response_status[equal_replies] = 'completed'
+
+  # if all are responded to, mark completed
+  response_status[no_responses >= no_recipients] = 'completed'
+
+  # if a report is pending or overdue and less than 56 days old, mark pending
+  response_status[~report_due & np.isin(response_status, ['overdue', 'partial'])] = 'pending'
+
+  # adding the statuses back to the reports
+  response_status[~has_recipients] = 'failed'
+  response_status[fetched['this_report_is_being_sent_to'].isna().values] = 'no requests'
+  reports['response status'] = response_status
+  reports['no. recipients'] = np.where(has_recipients, no_recipients, 0)
+  reports['no. replies'] = np.where(has_recipients, no_replies, 0)
+
+  # calculating the counts for each recipient
+  requests = pd.DataFrame({
+    'report_url': sent_to.pairs(reports['report_url']), 'ref': sent_to.pairs(reports['ref']),
+    'recipient': sent_to.names,
+    'status': request_status, 'year': sent_to.pairs(year)
+  })
+  counts['sent_types'] = sent_to.value_counts(request_status, 'status')
+  counts['sent_counts'] = sent_to.counts()
+  counts['sent_years'] = requests.value_counts(['year', 'status'])
+  counts['type_counts'] = requests.value_counts('status')
+
+  # calculating response status over time
+  counts['status_years'] = reports.assign(year=year).value_counts(['year', 'response status'])
+  counts['status_counts'] = reports.value_counts('response status')
+
+  # calculating statistics over coroner areas and names
+  for column in ['coroner_area', 'coroner_name']:
+    counts[f'{column}_statuses'] = reports.value_counts([column, 'response status'])
+    counts[f'{column}_sums'] = reports.groupby(column)[['no. recipients', 'no. replies']].sum()
+    counts[f'{column}_counts'] = reports[column].value_counts()
+
+  # calculating statistics over recipients
+  counts['rcpt_statuses'] = sent_to.value_counts(
+    sent_to.pairs(response_status), 'response status', levels=response_status
+  )
+  counts['rcpt_sums'] = sent_to.sums(reports[['no. recipients', 'no. replies']])
+  counts['rcpt_counts'] = counts['sent_counts']
+
+  # calculating the areas and categories of each recipient
+  report_categories = reports['category'].str.split(r'\s*\|\s*').apply(
+    lambda cats: [cat for cat in cats if cat in categories] if isinstance(cats, list) else cats
+  )
+  counts['rcpt_areas'] = sent_to.value_counts(sent_to.pairs(reports['coroner_area']), 'coroner_area')
+  counts['rcpt_categories'] = sent_to.cross(Incidence(report_categories, 'category'))
+
+  counts['no. reports'] = len(fetched)
+  counts['no. with recipients'] = fetched['this_report_is_being_sent_to'].notna().sum()
+  counts['no. parsed'] = has_recipients.sum()
+  counts['no. requests'] = np.maximum(sent_to.lengths, 1).sum()
+
+  return counts, reports, requests
 
 # %% [markdown]
-# ### Status based on recipients in replies
-
-exploded = non_na.explode('sent_to', ignore_index=True)
-responded = exploded.apply(lambda x: str(x['sent_to']) in str(x['escaped_urls']), axis=1)
-exploded['status'] = exploded['status'].mask(responded, 'received')
+# ### Counting the statuses of each chunk
+
+# a .csv of the statuses from an earlier run would otherwise be left stale
+status_csv_path = f"{DATA_PATH}/sent/statuses.csv"
+if not STATUSES_CSV and os.path.exists(status_csv_path):
+  os.remove(status_csv_path)
+
+parts = defaultdict(list)
+with ChunkWriter(f"{REPORTS_PATH}/reports-analysed.csv") as report_writer, \
+     ParquetChunkWriter(f"{DATA_PATH}/sent/statuses.parquet", STATUS_SCHEMA) as status_writer, \
+     (ChunkWriter(status_csv_path) if STATUSES_CSV else nullcontext()) as status_csv_writer:
+  for reports, fetched in chunks:
+    counts, reports, requests = count_statuses(reports, fetched)
+    for name, count in counts.items():
+      parts[name].append(count)
+
+    # Add our new columns to the reports
+    report_columns = reports.columns.tolist()
+    report_columns.insert(0, 'response status')
+    count_idx = report_columns.index('this_report_is_being_sent_to') + 1
+    report_columns.insert(count_idx, 'no. replies')
+    report_columns.insert(count_idx, 'no. recipients')
+    report_columns = list(dict.fromkeys(report_columns))
+
+    report_writer.write(reports[report_columns])
+
+    # only the recipient ids are written with each request, with their names
+    # written once to the recipients table
+    requests['year'] = requests['year'].astype('Int16')
+    status_writer.write(requests.assign(recipient_id=number_recipients(requests['recipient'])))
+    if status_csv_writer is not None:
+      status_csv_writer.write(requests)
+
+rcpt_index.save()
+
+no_reports = sum(parts['no. reports'])
+no_with_recipients = sum(parts['no. with recipients'])
+no_parsed = sum(parts['no. parsed'])
+no_requests = sum(parts['no. requests'])
 
 # %% [markdown]
 # ### Calculating the counts for each recipient
 
-sent_types = exploded.value_counts(['sent_to', 'status']).unstack(fill_value=0)
-sent_types['no. PFDs'] = exploded['sent_to'].value_counts()
+sent_types = merge_counts(parts['sent_types']).unstack(fill_value=0)
+sent_types['no. PFDs'] = merge_counts(parts['sent_counts'])
 sent_types = sent_types[['no. PFDs', 'overdue', 'pending', 'received']]\
   .sort_values('no. PFDs', ascending=False)
 sent_types['% received'] = (sent_types['received'] / sent_types['no. PFDs'] * 100).round(1)
 
-sent_counts = exploded.value_counts('sent_to')
-sent_years = exploded.value_counts(['year', 'status']).unstack(fill_value=0)
-type_counts = exploded.value_counts('status')
-
-# %% [markdown]
-# ### Calculating the status of each report
-
-non_na.loc[:, 'response status'] = 'partial'
-
-# for each report, calculate the list of recipients with responses
-responses_from = lambda row: [sent for sent in row['sent_to'] if sent in row['escaped_urls']]
-with_responses = non_na.apply(responses_from, axis=1)
-
-# if there's none, mark overdue
-no_responses = with_responses.str.len() == 0
-non_na.loc[no_responses, 'response status'] = 'overdue'
-
-# if there's an equal number of recipients and replies, mark completed
-equal_len = (
-  non_na['sent_to'].str.len() == non_na['replies'].str.len()) & (
-  non_na['sent_to'].str.len() > 0
-)
-non_na.loc[equal_len, 'response status'] = 'completed'
-
-# if all are responded to, mark completed
-all_responses = with_responses.str.len() >= non_na['sent_to'].str.len()
-non_na.loc[all_responses, 'response status'] = 'completed'
-
-# if a report is pending or overdue and less than 56 days old, mark pending
-non_na.loc[~report_due & (non_na['response status'] == 'overdue'), 'response status'] = 'pending'
-non_na.loc[~report_due & (non_na['response status'] == 'partial'), 'response status'] = 'pending'
-
-# %% [markdown]
-# ### Adding the non_na rows back to the reports
-
-reports.loc[:, 'response status'] = 'failed'
-reports.loc[non_na.index, 'response status'] = non_na['response status']
-empty_requests = fetched['this_report_is_being_sent_to'].isna()
-reports.loc[empty_requests, 'response status'] = 'no requests'
-
-reports.loc[:, 'no. recipients'] = 0
-reports.loc[non_na.index, 'no. recipients'] = non_na['no. recipients']
-
-reports.loc[:, 'no. replies'] = 0
-reports.loc[non_na.index, 'no. replies'] = non_na['no. replies']
-
-print(reports[['ref', 'response status']].head(10))
-print(reports['response status'].value_counts())
+sent_counts = merge_counts(parts['sent_counts'])
+sent_years = merge_counts(parts['sent_years']).unstack(fill_value=0)
+type_counts = merge_counts(parts['type_counts'])
 
 # %% [markdown]
 # ### Calculating response status over time
 
-status_years = reports.assign(year=report_date.dt.year).value_counts(['year', 'response status']).unstack(fill_value=0)
+status_years = merge_counts(parts['status_years']).unstack(fill_value=0)
 status_years = status_years[['no requests', 'failed', 'pending', 'overdue', 'partial', 'completed']]
 
-# %% [markdown]
-# ### Writing back the reports with the status
-
-# Add our new columns to the reports
-report_columns = reports.columns.tolist()
-report_columns.insert(0, 'response status')
-count_idx = report_columns.index('this_report_is_being_sent_to') + 1
-report_columns.insert(count_idx, 'no. replies')
-report_columns.insert(count_idx, 'no. recipients')
-report_columns = list(dict.fromkeys(report_columns))
-
-reports[report_columns].to_csv(f"{REPORTS_PATH}/reports-analysed.csv", index=False)
-
 # %% [markdown]
 # ### Calculating statistics
 
-status_counts = reports.value_counts('response status')
+status_counts = merge_counts(parts['status_counts'])
+print(status_counts)
 
 # %% [markdown]
 # ### Calculating statistics over coroner areas
 
-area_statuses = reports.value_counts(['coroner_area', 'response status']).unstack(fill_value=0)
-area_statuses.loc[:, ['no. recipients', 'no. replies']] = reports.groupby('coroner_area')[['no. recipients', 'no. replies']].sum()
+area_statuses = merge_counts(parts['coroner_area_statuses']).unstack(fill_value=0)
+area_statuses.loc[:, ['no. recipients', 'no. replies']] = merge_sums(parts['coroner_area_sums'])
 area_statuses = area_statuses.rename({
   "completed": "no. complete responses",
   "partial": "no. partial responses",
@@ -156,15 +296,15 @@ area_statuses = area_statuses.rename({
   "failed": "no. failed parses",
   "pending": "no. pending responses"
 },axis=1)
-area_statuses['no. PFDs'] = reports['coroner_area'].value_counts()
+area_statuses['no. PFDs'] = merge_counts(parts['coroner_area_counts'])
 area_statuses = area_statuses.sort_values('no. PFDs', ascending=False)
 area_statuses = area_statuses[['no. PFDs', 'no. recipients', 'no. replies', 'no. complete responses', 'no. partial responses', 'no. overdue responses', 'no. pending responses', 'no. failed parses']]
 
 # %% [markdown]
 # ### Calculating statistics over coroner names
 
-name_statuses = reports.value_counts(['coroner_name', 'response status']).unstack(fill_value=0)
-name_statuses.loc[:, ['no. recipients', 'no. replies']] = reports.groupby('coroner_name')[['no. recipients', 'no. replies']].sum()
+name_statuses = merge_counts(parts['coroner_name_statuses']).unstack(fill_value=0)
+name_statuses.loc[:, ['no. recipients', 'no. replies']] = merge_sums(parts['coroner_name_sums'])
 name_statuses = name_statuses.rename({
   "completed": "no. complete responses",
   "partial": "no. partial responses",
@@ -172,52 +312,70 @@ name_statuses = name_statuses.rename({
   "failed": "no. failed parses",
   "pending": "no. pending responses"
 },axis=1)
-name_statuses['no. PFDs'] = reports['coroner_name'].value_counts()
+name_statuses['no. PFDs'] = merge_counts(parts['coroner_name_counts'])
 name_statuses = name_statuses.sort_values('no. PFDs', ascending=False)
 name_statuses = name_statuses[['no. PFDs', 'no. recipients', 'no. replies', 'no. complete responses', 'no. partial responses', 'no. overdue responses', 'no. pending responses', 'no. failed parses']]
 
 # %% [markdown]
 # ### Calculating statistics over recipients
 
-exploded = reports.assign(sent_to=reports['this_report_is_being_sent_to'].str.split(vbar)).explode('sent_to', ignore_index=True)
-rcpt_statuses = exploded.value_counts(['sent_to', 'response status']).unstack(fill_value=0)
-rcpt_statuses.loc[:, ['no. recipients', 'no. replies']] = exploded.groupby('sent_to')[['no. recipients', 'no. replies']].sum()
+rcpt_statuses = merge_counts(parts['rcpt_statuses']).unstack(fill_value=0)
+rcpt_statuses.loc[:, ['no. recipients', 'no. replies']] = merge_sums(parts['rcpt_sums'])
 rcpt_statuses = rcpt_statuses.rename({
   "completed": "no. complete responses",
   "partial": "no. partial responses",
   "overdue": "no. overdue responses",
   "pending": "no. pending responses"
 },axis=1)
-rcpt_statuses['no. PFDs'] = exploded['sent_to'].value_counts()
+rcpt_statuses['no. PFDs'] = merge_counts(parts['rcpt_counts'])
 rcpt_statuses = rcpt_statuses.sort_values('no. PFDs', ascending=False)
 rcpt_statuses = rcpt_statuses[['no. PFDs', 'no. recipients', 'no. replies', 'no. complete responses', 'no. partial responses', 'no. overdue responses', 'no. pending responses']]
 # Quick note here: we won't ever get the no. failed parses as a recipient is only found if the parse is successful
 
+# %% [markdown]
+# ### Calculating the areas and categories of recipients
+
+rcpt_areas = merge_counts(parts['rcpt_areas']).unstack(fill_value=0)
+rcpt_categories = merge_counts(parts['rcpt_categories']).unstack(fill_value=0)
+
 # %% [markdown]
 # ### Various statistics about the counts
 
-without = len(fetched) - len(fetched_non_na)
-failed = len(fetched_non_na) - len(non_na)
+without = no_reports - no_with_recipients
+failed = no_with_recipients - no_parsed
+
+STATUSES = ['pending', 'overdue', 'partial', 'completed']
+TYPES = ['pending', 'received', 'overdue']
+report_cis = dict(zip(
+  ['parsed', 'without recipients', 'failed', *STATUSES],
+  percent_ci([no_parsed, without, failed, *status_counts[STATUSES]], no_reports)
+))
+request_cis = dict(zip(TYPES, percent_ci(type_counts[TYPES], no_requests)))
 
 toml_stats['this report is sent to'] = statistics = {
-  "reports parsed": [float(len(non_na)), percent(len(non_na), len(fetched))],
-  "reports without recipients": [float(without), percent(without, len(fetched))],
-  "reports failed": [float(failed), percent(failed, len(fetched))],
-  "reports pending": [float(status_counts['pending']), percent(status_counts['pending'], len(fetched))],
-  "reports overdue": [float(status_counts['overdue']), percent(status_counts['overdue'], len(fetched))],
-  "reports partial": [float(status_counts['partial']), percent(status_counts['partial'], len(fetched))],
-  "reports completed": [float(status_counts['completed']), percent(status_counts['completed'], len(fetched))],
+  "reports parsed": [float(no_parsed), percent(no_parsed, no_reports)],
+  "reports without recipients": [float(without), percent(without, no_reports)],
+  "reports failed": [float(failed), percent(failed, no_reports)],
+  "reports pending": [float(status_counts['pending']), percent(status_counts['pending'], no_reports)],
+  "reports overdue": [float(status_counts['overdue']), percent(status_counts['overdue'], no_reports)],
+  "reports partial": [float(status_counts['partial']), percent(status_counts['partial'], no_reports)],
+  "reports completed": [float(status_counts['completed']), percent(status_counts['completed'], no_reports)],
+  **{f"reports {name} {CI_NAME}": ci for name, ci in report_cis.items()},
 }
 
 toml_stats['requests for response'] = {
   "no. recipients with requests": len(sent_counts),
-  "no. requests for response": len(exploded),
-  "requests pending": [float(type_counts['pending']), percent(type_counts['pending'], len(exploded))],
-  "requests received": [float(type_counts['received']), percent(type_counts['received'], len(exploded))],
-  "requests overdue": [float(type_counts['overdue']), percent(type_counts['overdue'], len(exploded))],
+  "no. requests for response": no_requests,
+  "requests pending": [float(type_counts['pending']), percent(type_counts['pending'], no_requests)],
+  "requests received": [float(type_counts['received']), percent(type_counts['received'], no_requests)],
+  "requests overdue": [float(type_counts['overdue']), percent(type_counts['overdue'], no_requests)],
+  **{f"requests {name} {CI_NAME}": ci for name, ci in request_cis.items()},
   "mean no. requests per recipient": round(sent_counts.mean(), 1),
+  f"mean no. requests per recipient {CI_NAME}": mean_ci(sent_counts),
   "median no. requests per recipient": sent_counts.median(),
+  f"median no. requests per recipient {CI_NAME}": median_ci(sent_counts),
   "IQR of requests per recipients": list(sent_counts.quantile([0.25, 0.75])),
+  f"IQR of requests per recipients {CI_NAME}": quantile_ci(sent_counts, [0.25, 0.75]),
 }
 
 print(f"Name count statistics: {statistics}")
@@ -238,8 +396,20 @@ sent_types.to_csv(f"{DATA_PATH}/sent/sent-types.csv")
 top_types.to_csv(f"{DATA_PATH}/sent/top-sent-types.csv")
 sent_years.to_csv(f"{DATA_PATH}/sent/sent-types-years.csv")
 status_years.to_csv(f"{DATA_PATH}/sent/status-years.csv")
-exploded.to_csv(f"{DATA_PATH}/sent/statuses.csv", index=False)
 
 area_statuses.to_csv(f"{DATA_PATH}/sent/area-statuses.csv")
 name_statuses.to_csv(f"{DATA_PATH}/sent/name-statuses.csv")
 rcpt_statuses.to_csv(f"{DATA_PATH}/sent/rcpt-statuses.csv")
+rcpt_areas.to_csv(f"{DATA_PATH}/sent/rcpt-areas.csv")
+rcpt_categories.to_csv(f"{DATA_PATH}/sent/rcpt-categories.csv")
+
+# every recipient renamed to a known destination, so the matches can be reviewed
+rcpt_matches = pd.Series(rcpt_index.remaps(), name='known destination', dtype=object)
+rcpt_matches.rename_axis('sent_to').to_csv(f"{DATA_PATH}/sent/rcpt-matches.csv")
+print(f"Matched {len(rcpt_matches)} recipients to known destinations")
+
+recipients = pd.DataFrame({
+  'recipient_id': np.array(list(recipient_ids.values()), dtype=np.int32),
+  'recipient': list(recipient_ids),
+})
+recipients.to_parquet(recipients_path, index=False, compression='zstd')
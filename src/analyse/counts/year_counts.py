@@ -9,7 +9,7 @@
 import os
 import pandas as pd
 
-from helpers import toml_stats
+from helpers import toml_stats, read_reports, merge_counts, CI_NAME, resample, interval, median_ci, quantile_ci
 
 PATH = os.path.dirname(__file__)
 DATA_PATH = os.path.abspath(f"{PATH}/data")
@@ -18,31 +18,36 @@ REPORTS_PATH = os.path.abspath(f"{PATH}/../../data")
 # %% [markdown]
 # ### Reading the reports
 
-reports = pd.read_csv(f"{REPORTS_PATH}/reports-analysed.csv")
+chunks = read_reports(f"{REPORTS_PATH}/reports-analysed.csv", ['date_of_report'])
 
 # %% [markdown]
-# ### Extracting the dates of reports
+# ### Counting the number of reports in each year
 
-# use a regex to extract the year from the date of report
-reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
-reports['datetime'] = pd.to_datetime(reports["date_of_report"], format="%d/%m/%Y", errors="coerce")
+year_parts, no_parsed, earliest, latest = [], 0, pd.NaT, pd.NaT
+for reports in chunks:
+  # use a regex to extract the year from the date of report
+  reports['year'] = reports['date_of_report'].str.extract(r'\d{2}\/\d{2}\/(\d{4})')
+  reports['datetime'] = pd.to_datetime(reports["date_of_report"], format="%d/%m/%Y", errors="coerce")
 
-earliest = reports["datetime"].min()
-latest = reports["datetime"].max()
-year_diff = latest.year - earliest.year + (latest.month - earliest.month) / 12 + (latest.day - earliest.day) / 365
+  earliest = pd.Series([earliest, reports["datetime"].min()]).min()
+  latest = pd.Series([latest, reports["datetime"].max()]).max()
 
-# %% [markdown]
-# ### Counting the number of reports in each year
+  # group by the year and count the number of reports
+  year_parts.append(reports.value_counts('year'))
+  no_parsed += reports.count()['year']
 
-# group by the year and count the number of reports
-year_counts = reports.value_counts('year').sort_index()
+year_counts = merge_counts(year_parts).sort_index()
+year_diff = latest.year - earliest.year + (latest.month - earliest.month) / 12 + (latest.day - earliest.day) / 365
 
 toml_stats['year'] = statistics = {
-  "no. reports parsed": reports.count()['year'],
+  "no. reports parsed": no_parsed,
   "no. years covered": len(year_counts),
-  "mean per year": round(reports.count()['year'] / year_diff, 1),
+  "mean per year": round(no_parsed / year_diff, 1),
+  f"mean per year {CI_NAME}": interval(resample(year_counts).sum(axis=1) / year_diff),
   "median per year": year_counts.median(),
+  f"median per year {CI_NAME}": median_ci(year_counts),
   "IQR of years": list(year_counts.quantile([0.25, 0.75])),
+  f"IQR of years {CI_NAME}": quantile_ci(year_counts, [0.25, 0.75]),
 }
 
 print(f"Year counts statistics: {statistics}")
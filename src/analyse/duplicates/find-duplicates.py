@@ -0,0 +1,176 @@
+# %% [markdown]
+# ## Process
+# The judiciary site sometimes re-publishes the same report under a new url,
+# or with light edits, so here we look for reports whose text is (nearly) the
+# same as another report's.
+#
+# Comparing the text of every pair of reports is far too slow, so instead:
+# 1. Split the text of each report into shingles (runs of 5 words)
+# 2. Compute a MinHash signature of each report's shingles
+# 3. Use locality-sensitive hashing to find pairs of reports with similar signatures
+# 4. Estimate the similarity of each candidate pair from their signatures
+#
+# Signatures are saved between runs and looked up by a digest of the report's
+# text, so only new (or edited) reports need to be shingled and hashed. The
+# candidates from the last run are kept too, so only pairs with a new report
+# need to be found.
+
+# %% [markdown]
+# ### Parsing arguments
+
+import argparse
+
+parser = argparse.ArgumentParser(
+  description="Find candidate duplicate reports from the similarity of their text",
+  formatter_class=argparse.ArgumentDefaultsHelpFormatter
+)
+parser.add_argument(
+  "-r", "--reports", type=str,
+  nargs="?", default="reports-corrected.csv",
+  help="The .csv file containing the reports"
+)
+parser.add_argument(
+  "-o", "--output", type=str,
+  nargs="?", default="duplicate-candidates.csv",
+  help="The .csv file to output the candidate duplicates to"
+)
+parser.add_argument(
+  "-s", "--signatures", type=str,
+  nargs="?", default="signatures.npz",
+  help="The .npz file to keep the signatures of the reports in between runs"
+)
+parser.add_argument(
+  "-t", "--threshold", type=float,
+  nargs="?", default=0.8,
+  help="The smallest estimated similarity for a pair to be a candidate duplicate"
+)
+parser.add_argument(
+  "-k", "--shingle-size", type=int,
+  nargs="?", default=5,
+  help="The no. words in each shingle"
+)
+parser.add_argument(
+  "-p", "--permutations", type=int,
+  nargs="?", default=128,
+  help="The no. hash functions in each signature"
+)
+parser.add_argument(
+  "-b", "--bands", type=int,
+  nargs="?", default=16,
+  help="The no. bands to split the signatures into when finding candidates"
+)
+parser.add_argument(
+  "-m", "--max-bucket", type=int,
+  nargs="?", default=200,
+  help="The most reports in a bucket to pair up, larger buckets are skipped"
+)
+
+args = parser.parse_args()
+
+# %% [markdown]
+# ### Importing libraries
+
+import os
+import numpy as np
+import pandas as pd
+
+from minhash import MinHasher, text_digest, shingle_hashes, candidate_pairs, similarity
+
+SEED = 1
+TEXT_COLUMNS = ['circumstances', 'concerns', 'inquest']
+
+PATH = os.path.dirname(__file__)
+DATA_PATH = os.path.abspath(f"{PATH}/data")
+REPORTS_PATH = os.path.abspath(f"{PATH}/../../data")
+
+# %% [markdown]
+# ### Reading the reports
+
+reports = pd.read_csv(
+  f"{REPORTS_PATH}/{args.reports}",
+  usecols=['ref', 'report_url', *TEXT_COLUMNS], dtype=str
+)
+texts = reports[TEXT_COLUMNS].fillna('').agg('\n\n'.join, axis=1)
+digests = np.array([text_digest(text) for text in texts])
+
+# %% [markdown]
+# ### Loading the saved signatures and candidates
+# Signatures are only reused if they were made with the same settings, and the
+# candidates only if they were also found with the same settings
+
+params = np.array([args.shingle_size, args.permutations, SEED])
+pair_params = np.array([args.bands, args.threshold, args.max_bucket], dtype=float)
+signatures_path = f"{DATA_PATH}/{args.signatures}"
+output_path = f"{DATA_PATH}/{args.output}"
+
+known, checked, previous = {}, set(), None
+if os.path.exists(signatures_path):
+  saved = np.load(signatures_path)
+  if np.array_equal(saved['params'], params):
+    known = dict(zip(saved['digests'], saved['signatures']))
+    if 'pair_params' in saved and np.array_equal(saved['pair_params'], pair_params) \
+        and os.path.exists(output_path):
+      checked = set(zip(saved['checked_urls'], saved['checked_digests']))
+      previous = pd.read_csv(output_path, dtype={'ref': str, 'duplicate_ref': str})
+
+# reports are new if their url or text wasn't in the last run, as a report
+# re-published under a new url has the same text (and signature) as the old one
+is_unhashed = np.array([digest not in known for digest in digests])
+is_new = np.array([pair not in checked for pair in zip(reports['report_url'], digests)])
+print(f"Reusing {len(reports) - is_unhashed.sum()} signatures, computing {is_unhashed.sum()}")
+
+# %% [markdown]
+# ### Computing the signatures of new reports
+
+hasher = MinHasher(args.permutations, SEED)
+new_signatures = hasher.signatures([
+  shingle_hashes(text, args.shingle_size)
+  for text in texts[is_unhashed]
+])
+known.update(zip(digests[is_unhashed], new_signatures))
+
+signatures = np.empty((len(reports), args.permutations), dtype=np.uint32)
+for i, digest in enumerate(digests):
+  signatures[i] = known[digest]
+
+# %% [markdown]
+# ### Finding the candidate duplicates
+
+pairs = candidate_pairs(signatures, args.bands, is_new, args.max_bucket)
+scores = similarity(signatures, pairs)
+pairs, scores = pairs[scores >= args.threshold], scores[scores >= args.threshold]
+
+first, second = reports.iloc[pairs[:, 0]], reports.iloc[pairs[:, 1]]
+candidates = pd.DataFrame({
+  'ref': first['ref'].values,
+  'duplicate_ref': second['ref'].values,
+  'similarity': scores.round(3),
+  'new': is_new[pairs[:, 0]] | is_new[pairs[:, 1]],
+  'report_url': first['report_url'].values,
+  'duplicate_url': second['report_url'].values,
+})
+
+# keep the last run's candidates between reports that haven't changed since
+if previous is not None:
+  unchanged = reports.loc[~is_new, 'report_url']
+  previous = previous[previous['report_url'].isin(unchanged) & previous['duplicate_url'].isin(unchanged)]
+  candidates = pd.concat([previous.assign(new=False), candidates], ignore_index=True)
+
+candidates = candidates.sort_values(['similarity', 'ref'], ascending=[False, True], kind='stable')
+
+print(f"Found {len(candidates)} candidate duplicates, {candidates['new'].sum()} involving new reports")
+
+# %% [markdown]
+# ### Saving the results
+# Only signatures of the current reports are kept, so edited reports don't
+# leave stale signatures behind
+
+os.makedirs(DATA_PATH, exist_ok=True)
+candidates.to_csv(output_path, index=False)
+
+unique_digests, firsts = np.unique(digests, return_index=True)
+np.savez_compressed(
+  signatures_path, params=params, pair_params=pair_params,
+  digests=unique_digests, signatures=signatures[firsts],
+  checked_urls=reports['report_url'].values.astype(str), checked_digests=digests
+)
@@ -0,0 +1,109 @@
+import re
+import zlib
+import hashlib
+import warnings
+import numpy as np
+
+# a large odd multiplier for combining the hashes of the words in a shingle
+SHINGLE_PRIME = np.uint64(0x100000001B3)
+
+def text_digest(text):
+  '''A digest of a report's text, used to tell whether its signature is stale.'''
+  return hashlib.sha1(text.encode('utf8')).hexdigest()
+
+def shingle_hashes(text, k=5):
+  '''
+  Hashes each run of `k` consecutive words in the text to a 64 bit integer.
+  The words are hashed with crc32 (rather than `hash`) so the hashes are the
+  same on every run, and combined as a polynomial over the run.
+  '''
+  words = re.findall(r"[a-z0-9]+", text.lower())
+  if not words:
+    return np.empty(0, dtype=np.uint64)
+
+  word_hashes = np.array([zlib.crc32(word.encode('utf8')) for word in words], dtype=np.uint64)
+  k = min(k, len(words))
+  hashes = np.zeros(len(words) - k + 1, dtype=np.uint64)
+  for i in range(k):
+    # uint64 arithmetic wraps around, which is what we want for hashing
+    hashes = hashes * SHINGLE_PRIME + word_hashes[i:len(hashes) + i]
+  return np.unique(hashes)
+
+class MinHasher:
+  '''
+  Computes MinHash signatures of sets of shingle hashes, using `num_perm`
+  multiply-shift hash functions seeded from `seed`. The fraction of equal
+  values in two signatures estimates the Jaccard similarity of the sets.
+  '''
+  def __init__(self, num_perm=128, seed=1):
+    rng = np.random.default_rng(seed)
+    self.num_perm = num_perm
+    self.mults = rng.integers(1, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    self.adds = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+
+  def signatures(self, shingle_sets):
+    '''The signature of each set of shingle hashes, as a (sets x num_perm) array.'''
+    lengths = np.array([len(shingles) for shingles in shingle_sets], dtype=np.int64)
+    signatures = np.full((len(shingle_sets), self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    if lengths.sum() == 0:
+      return signatures
+
+    # take the minimum over each set's slice of the flattened shingles at once
+    flat = np.concatenate([shingles for shingles in shingle_sets if len(shingles)])
+    nonempty = lengths > 0
+    starts = (np.cumsum(lengths) - lengths)[nonempty]
+    for i, (mult, add) in enumerate(zip(self.mults, self.adds)):
+      hashes = ((flat * mult + add) >> np.uint64(32)).astype(np.uint32)
+      signatures[nonempty, i] = np.minimum.reduceat(hashes, starts)
+    return signatures
+
+def similarity(signatures, pairs):
+  '''The estimated Jaccard similarity of each pair of rows of `signatures`.'''
+  return (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+
+def candidate_pairs(signatures, bands=16, is_new=None, max_bucket=200):
+  '''
+  Finds the pairs of rows of `signatures` that are equal in at least one band
+  of `num_perm / bands` values (locality-sensitive hashing). Pairs with a
+  similarity of s are found with probability 1 - (1 - s^rows)^bands.
+
+  Only pairs with at least one row in `is_new` (all rows by default) are
+  found, so new rows can be checked against the rest without pairing the rows
+  that were already checked. Buckets of more than `max_bucket` rows (i.e. from
+  text shared by many reports) are skipped, as pairing them is quadratic.
+  '''
+  num_perm = signatures.shape[1]
+  rows = num_perm // bands
+  empty = (signatures == np.iinfo(np.uint32).max).all(axis=1)
+  is_new = np.ones(len(signatures), dtype=bool) if is_new is None else np.asarray(is_new)
+
+  pairs, skipped = [], 0
+  for band in range(bands):
+    # rows in the same bucket have exactly the same values in this band
+    values = signatures[:, band * rows:(band + 1) * rows]
+    _, buckets = np.unique(values, axis=0, return_inverse=True)
+    buckets = buckets.ravel()
+
+    # reports without any text are never candidates
+    order = np.argsort(buckets, kind='stable')
+    order = order[~empty[order]]
+    _, starts, sizes = np.unique(buckets[order], return_index=True, return_counts=True)
+    for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+      members = order[start:start + size]
+      new_members = members[is_new[members]]
+      if len(new_members) == 0:
+        continue
+      if size > max_bucket:
+        skipped += 1
+        continue
+
+      # pair each new member with every other member of the bucket
+      firsts, seconds = np.repeat(new_members, size), np.tile(members, len(new_members))
+      distinct = firsts != seconds
+      pairs.append(np.stack([firsts[distinct], seconds[distinct]], axis=1))
+
+  if skipped:
+    warnings.warn(f"Skipped {skipped} buckets of more than {max_bucket} reports")
+  if not pairs:
+    return np.empty((0, 2), dtype=np.int64)
+  return np.unique(np.sort(np.concatenate(pairs), axis=1), axis=0)
@@ -0,0 +1,166 @@
+# %% [markdown]
+# ## Process
+# Here we benchmark the labelling of reports on a fixed set of reports, so that
+# changes to the labeller, the model or its dependencies that slow it down (or
+# change its tags) are caught before a full labelling run.
+#
+# In full the process is:
+# 1. Time loading the model and embedding the causes of death
+# 2. Time labelling each report in the fixture
+# 3. Compare the tags against the stored (golden) tags for the fixture
+# 4. Append the timings to the benchmark history
+#
+# The fixture is a pinned sample of `medical-cause-reports.csv`, whose `tags`
+# column holds the golden tags. These can be updated with `--update-golden`.
+
+# %% [markdown]
+# ### Parsing arguments
+
+import argparse
+
+parser = argparse.ArgumentParser(
+  description="Benchmark the labelling of reports with causes of death",
+  formatter_class=argparse.ArgumentDefaultsHelpFormatter
+)
+parser.add_argument(
+  "-f", "--fixture", type=str,
+  nargs="?", default="benchmark-reports.csv",
+  help="The .csv file containing the fixture reports and their golden tags"
+)
+parser.add_argument(
+  "-c", "--causes", type=str,
+  nargs="?", default="medical-causes.txt",
+  help="The .txt file containing the causes of death"
+)
+parser.add_argument(
+  "-o", "--output", type=str,
+  nargs="?", default="benchmark-history.json",
+  help="The .json file to append the benchmark results to"
+)
+parser.add_argument(
+  "-t", "--tolerance", type=float,
+  nargs="?", default=1e-3,
+  help="The largest difference in scores that still agrees with the golden tags"
+)
+parser.add_argument(
+  "--update-golden", action="store_true",
+  help="Overwrite the golden tags with the tags from this run"
+)
+
+args = parser.parse_args()
+
+# %% [markdown]
+# ### Importing libraries
+
+import os
+import sys
+import json
+import time
+import resource
+from ast import literal_eval
+from datetime import datetime, timezone
+
+import torch
+import pandas as pd
+import sentence_transformers
+
+from labelling import load_model, read_causes, embed_causes, cause_sections, split_sentences, label_sections
+
+PATH = os.path.dirname(__file__)
+DATA_PATH = os.path.abspath(f"{PATH}/data")
+
+def peak_rss():
+  '''The peak resident memory of this process, in MB.'''
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # linux reports this in KB, macOS in bytes
+  return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+# %% [markdown]
+# ### Reading the fixture
+
+fixture = pd.read_csv(f"{DATA_PATH}/{args.fixture}")
+sections = cause_sections(fixture)
+no_sentences = sum(
+  len(split_sentences(section)) for section in sections
+  if isinstance(section, str)
+)
+
+# %% [markdown]
+# ### Timing the model and cause embeddings
+
+start = time.perf_counter()
+embed_model = load_model()
+model_load = time.perf_counter() - start
+
+causes = read_causes(f"{DATA_PATH}/{args.causes}")
+start = time.perf_counter()
+cause_embeds = embed_causes(embed_model, causes)
+cause_embed = time.perf_counter() - start
+
+# %% [markdown]
+# ### Timing the labelling
+
+start = time.perf_counter()
+likely_causes = label_sections(embed_model, causes, cause_embeds, sections)
+labelling = time.perf_counter() - start
+
+# %% [markdown]
+# ### Comparing against the golden tags
+
+def agrees(tags, golden):
+  '''Whether the tags have the same causes as the golden tags, with close scores.'''
+  if not isinstance(golden, str):
+    return not isinstance(tags, list)
+  if not isinstance(tags, list):
+    return False
+  golden = literal_eval(golden)
+  return len(tags) == len(golden) and all(
+    cause == golden_cause and abs(score - golden_score) <= args.tolerance
+    for (cause, score), (golden_cause, golden_score) in zip(tags, golden)
+  )
+
+agreement = [agrees(tags, golden) for tags, golden in zip(likely_causes, fixture['tags'])]
+disagreeing = fixture.loc[[not agree for agree in agreement], 'ref'].tolist()
+
+# %% [markdown]
+# ### Writing the results to the history
+
+result = {
+  "date": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+  "torch": torch.__version__,
+  "sentence-transformers": sentence_transformers.__version__,
+  "threads": torch.get_num_threads(),
+  "no. reports": len(fixture),
+  "no. sentences": no_sentences,
+  "model load (s)": round(model_load, 3),
+  "cause embedding (s)": round(cause_embed, 3),
+  "labelling (s)": round(labelling, 3),
+  "sentences per second": round(no_sentences / labelling, 2),
+  "reports per second": round(len(fixture) / labelling, 2),
+  "peak RSS (MB)": round(peak_rss(), 1),
+  "% agreeing with golden tags": round(sum(agreement) / len(agreement) * 100, 1),
+}
+
+print(f"Benchmark results: {json.dumps(result, indent=2)}")
+if disagreeing:
+  print(f"Reports disagreeing with the golden tags: {disagreeing}")
+
+history_path = f"{DATA_PATH}/{args.output}"
+history = []
+if os.path.exists(history_path):
+  with open(history_path, 'r', encoding='utf8') as rf:
+    history = json.load(rf)
+
+history.append(result)
+with open(history_path, 'w', encoding='utf8') as wf:
+  json.dump(history, wf, indent=2)
+
+# %% [markdown]
+# ### Updating the golden tags
+
+if args.update_golden:
+  fixture.loc[:, 'tags'] = likely_causes
+  fixture.to_csv(f"{DATA_PATH}/{args.fixture}", index=False)
+elif disagreeing:
+  # fail the run, so that changed tags aren't mistaken for a clean benchmark
+  sys.exit(f"{len(disagreeing)} reports disagree with the golden tags")
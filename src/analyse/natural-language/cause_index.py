@@ -0,0 +1,77 @@
+import json
+import warnings
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+def tags_table(reports, likely_causes, causes):
+  '''
+  Flattens the tags of each report into a long table of (report url, ref,
+  cause id, score, rank), where the cause id is the index of the cause in
+  `causes`. Reports are keyed by their url, as many reports are missing a ref
+  or share theirs with another report.
+  The table is sorted by cause and then by descending score, so that the
+  reports for each cause are stored together.
+  Tags for causes that aren't in `causes` (i.e. from reports labelled with an
+  older list of causes) are skipped with a warning.
+  '''
+  cause_ids = {cause: i for i, cause in reversed(list(enumerate(causes)))}
+  rows = [
+    (url, ref, cause, score, rank)
+    for url, ref, tags in zip(reports['report_url'], reports['ref'], likely_causes)
+    if isinstance(tags, list)
+    for rank, (cause, score) in enumerate(tags, start=1)
+  ]
+
+  unknown = sorted({row[2] for row in rows} - cause_ids.keys())
+  if unknown:
+    warnings.warn(f"Skipping tags for causes that aren't in the list of causes: {unknown}")
+  rows = [
+    (url, ref, cause_ids[cause], score, rank)
+    for url, ref, cause, score, rank in rows if cause in cause_ids
+  ]
+
+  tags = pd.DataFrame(rows, columns=['report_url', 'ref', 'cause_id', 'score', 'rank'])
+  tags = tags.astype({'cause_id': np.int32, 'score': np.float32, 'rank': np.int8})
+  tags = tags.sort_values(['cause_id', 'score'], ascending=[True, False], kind='stable')
+  return tags.reset_index(drop=True)
+
+def write_tags(tags, causes, path):
+  '''Writes the tags to a .parquet file, keeping the cause names in its metadata.'''
+  table = pa.Table.from_pandas(tags, preserve_index=False)
+  metadata = dict(table.schema.metadata or {}, causes=json.dumps(causes))
+  pq.write_table(table.replace_schema_metadata(metadata), path, compression='zstd')
+
+def read_tags(path):
+  '''Reads the tags and cause names from a .parquet file.'''
+  table = pq.read_table(path)
+  causes = json.loads(table.schema.metadata[b'causes'])
+  return table.to_pandas(), causes
+
+class CauseIndex:
+  '''
+  An inverted index from each cause of death to the reports tagged with it,
+  ordered by descending score.
+  '''
+  def __init__(self, path):
+    self.tags, self.causes = read_tags(path)
+    self.cause_ids = {cause: i for i, cause in reversed(list(enumerate(self.causes)))}
+
+    # the tags are sorted by cause, so each cause's reports are a single slice
+    self.offsets = np.searchsorted(
+      self.tags['cause_id'].values, np.arange(len(self.causes) + 1)
+    )
+
+  def __getitem__(self, cause):
+    '''The reports tagged with a cause (given by name or id), by descending score.'''
+    cause_id = self.cause_ids[cause] if isinstance(cause, str) else cause
+    start, end = self.offsets[cause_id], self.offsets[cause_id + 1]
+    return self.tags.iloc[start:end]
+
+  def find(self, text):
+    '''The reports tagged with any cause containing `text`, by descending score.'''
+    matches = [self[i] for i, cause in enumerate(self.causes) if text.lower() in cause]
+    if not matches:
+      return self.tags.iloc[:0]
+    return pd.concat(matches).sort_values('score', ascending=False, kind='stable')
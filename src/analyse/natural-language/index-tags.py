@@ -0,0 +1,70 @@
+# %% [markdown]
+# ## Process
+# Here we convert the tags column of already labelled reports into the long
+# table of (report url, ref, cause id, score, rank) tags written by `label-reports.py`.
+# This means reports labelled before the long table existed don't need to be
+# labelled again, which takes hours.
+
+# %% [markdown]
+# ### Parsing arguments
+
+import argparse
+
+parser = argparse.ArgumentParser(
+  description="Convert the tags column of labelled reports to a long table",
+  formatter_class=argparse.ArgumentDefaultsHelpFormatter
+)
+parser.add_argument(
+  "-r", "--reports", type=str,
+  nargs="?", default="medical-cause-reports.csv",
+  help="The .csv file containing the labelled reports"
+)
+parser.add_argument(
+  "-c", "--causes", type=str,
+  nargs="?", default="medical-causes.txt",
+  help="The .txt file containing the causes of death"
+)
+parser.add_argument(
+  "-t", "--tags", type=str,
+  nargs="?", default="medical-cause-tags.parquet",
+  help="The .parquet file to output the long table of tags to"
+)
+parser.add_argument(
+  "-l", "--label", type=str,
+  nargs="?", default="tags",
+  help="The column containing the labels"
+)
+
+args = parser.parse_args()
+
+# %% [markdown]
+# ### Importing libraries
+
+import os
+from ast import literal_eval
+from pandas import read_csv
+
+from cause_index import tags_table, write_tags
+
+PATH = os.path.dirname(__file__)
+DATA_PATH = os.path.abspath(f"{PATH}/data")
+
+# %% [markdown]
+# ### Reading the labelled reports and causes
+
+reports = read_csv(f"{DATA_PATH}/{args.reports}")
+likely_causes = [
+  literal_eval(tags) if isinstance(tags, str) else tags
+  for tags in reports[args.label]
+]
+
+with open(f"{DATA_PATH}/{args.causes}", 'r', encoding='utf8') as rf:
+  causes = [line.strip().lower() for line in rf.readlines()]
+
+# %% [markdown]
+# ### Writing the long table of tags
+
+tags = tags_table(reports, likely_causes, causes)
+write_tags(tags, causes, f"{DATA_PATH}/{args.tags}")
+
+print(f"Wrote {len(tags)} tags for {tags['report_url'].nunique()} reports")
@@ -41,6 +41,11 @@ parser.add_argument(
   nargs="?", default="medical-cause-reports.csv",
   help="The .csv file to output the labelled reports to"
 )
+parser.add_argument(
+  "-t", "--tags", type=str,
+  nargs="?", default="medical-cause-tags.parquet",
+  help="The .parquet file to output the long table of tags to"
+)
 parser.add_argument(
   "-l", "--label", type=str,
   nargs="?", default="tags",
@@ -53,9 +58,11 @@ args = parser.parse_args()
 # ### Importing libraries
 
 import os
-import torch
 from tqdm import tqdm
 
+from labelling import load_model, read_causes, embed_causes, cause_sections, label_sections
+from cause_index import tags_table, write_tags
+
 PATH = os.path.dirname(__file__)
 DATA_PATH = os.path.abspath(f"{PATH}/data")
 REPORTS_PATH = os.path.abspath(f"{PATH}/../../data")
@@ -63,23 +70,16 @@ REPORTS_PATH = os.path.abspath(f"{PATH}/../../data")
 # %% [markdown]
 # ### Import and load model
 
-from sentence_transformers import SentenceTransformer, util
-
-embed_model = SentenceTransformer(
-  'pritamdeka/BioBERT-mnli-snli-scinli-scitail-mednli-stsb'
-)
+embed_model = load_model()
 
 # %% [markdown]
 # ### Precalculating the encodings of the death causes
 
-with open(f'{DATA_PATH}/{args.causes}', 'r', encoding='utf8') as rf:
-  causes = [line.strip().lower() for line in rf.readlines()]
-
-with torch.no_grad():
-  cause_embeds = torch.stack([
-    embed_model.encode(cause, convert_to_tensor=True)
-    for cause in tqdm(causes, "Calculating embeds")
-  ])
+causes = read_causes(f'{DATA_PATH}/{args.causes}')
+cause_embeds = embed_causes(
+  embed_model, causes,
+  progress=lambda causes: tqdm(causes, "Calculating embeds")
+)
 
 # %% [markdown]
 # ### Read in the csv and circumstances
@@ -87,44 +87,15 @@ with torch.no_grad():
 from pandas import read_csv
 
 reports = read_csv(f"{REPORTS_PATH}/{args.reports}")
-cause_sections = [
-  inquest + "\n\n" + circumstances
-    if isinstance(inquest, str) and isinstance(circumstances, str)
-    else inquest
-  for inquest, circumstances in zip(reports.inquest, reports.circumstances)
-]
+sections = cause_sections(reports)
 
 # %% [markdown]
 # ### Determine the top-k most likely causes
 
-def get_most_likely(inquest, max_num=5, min_prob=0.3):
-  '''
-  Determines the most likely causes of death from the inquest text.
-  Returns the `max_num` most likely causes with a similarity of at least `min_prob`.
-  Similarity is determined by the cosine similarity between the sentence embeddings.
-  '''
-  if not isinstance(inquest, str):
-    return inquest
-
-  embed_list = [
-    embed_model.encode(sentence.strip(), convert_to_tensor=True)
-    for sentence in inquest.split(".") if len(sentence) > 0
-  ]
-  inquest_embeds = torch.stack(embed_list)
-  similarity = util.cos_sim(cause_embeds, inquest_embeds)
-  max_sim, _ = torch.max(similarity, dim=1)
-
-  indices = torch.argsort(max_sim, descending=True)[:max_num]
-  return [
-    (causes[i], max_sim[i].item())
-    for i in indices if max_sim[i] > min_prob
-  ]
-
-with torch.no_grad():
-  likely_causes = [
-    get_most_likely(section)
-    for section in tqdm(cause_sections, desc="Calculating tags")
-  ]
+likely_causes = label_sections(
+  embed_model, causes, cause_embeds, sections,
+  progress=lambda sections: tqdm(sections, desc="Calculating tags")
+)
 
 print(likely_causes)
 
@@ -133,3 +104,11 @@ print(likely_causes)
 
 reports.loc[:, args.label] = likely_causes
 reports.to_csv(f"{DATA_PATH}/{args.output}", index=False)
+
+# %% [markdown]
+# ### Write the long table of tags
+# This stores a row for each (report, cause) tag, so causes can be looked up
+# without parsing the tags column of the reports
+
+tags = tags_table(reports, likely_causes, causes)
+write_tags(tags, causes, f"{DATA_PATH}/{args.tags}")
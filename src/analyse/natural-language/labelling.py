@@ -0,0 +1,65 @@
+import torch
+from sentence_transformers import SentenceTransformer, util
+
+MODEL_NAME = 'pritamdeka/BioBERT-mnli-snli-scinli-scitail-mednli-stsb'
+
+def load_model(name=MODEL_NAME):
+  '''Loads the sentence embedding model used to label the reports.'''
+  return SentenceTransformer(name)
+
+def read_causes(path):
+  '''Reads the causes of death, one per line, from a .txt file.'''
+  with open(path, 'r', encoding='utf8') as rf:
+    return [line.strip().lower() for line in rf.readlines()]
+
+def embed_causes(embed_model, causes, progress=iter):
+  '''Precalculates the embedding of each cause of death.'''
+  with torch.no_grad():
+    return torch.stack([
+      embed_model.encode(cause, convert_to_tensor=True)
+      for cause in progress(causes)
+    ])
+
+def cause_sections(reports):
+  '''Joins the inquest and circumstances of each report into the text to label.'''
+  return [
+    inquest + "\n\n" + circumstances
+      if isinstance(inquest, str) and isinstance(circumstances, str)
+      else inquest
+    for inquest, circumstances in zip(reports.inquest, reports.circumstances)
+  ]
+
+def split_sentences(section):
+  '''Splits a section into the sentences that are embedded.'''
+  return [sentence.strip() for sentence in section.split(".") if len(sentence) > 0]
+
+def get_most_likely(embed_model, causes, cause_embeds, inquest, max_num=5, min_prob=0.3):
+  '''
+  Determines the most likely causes of death from the inquest text.
+  Returns the `max_num` most likely causes with a similarity of at least `min_prob`.
+  Similarity is determined by the cosine similarity between the sentence embeddings.
+  '''
+  if not isinstance(inquest, str):
+    return inquest
+
+  embed_list = [
+    embed_model.encode(sentence, convert_to_tensor=True)
+    for sentence in split_sentences(inquest)
+  ]
+  inquest_embeds = torch.stack(embed_list)
+  similarity = util.cos_sim(cause_embeds, inquest_embeds)
+  max_sim, _ = torch.max(similarity, dim=1)
+
+  indices = torch.argsort(max_sim, descending=True)[:max_num]
+  return [
+    (causes[i], max_sim[i].item())
+    for i in indices if max_sim[i] > min_prob
+  ]
+
+def label_sections(embed_model, causes, cause_embeds, sections, progress=iter):
+  '''Labels each section with its most likely causes of death.'''
+  with torch.no_grad():
+    return [
+      get_most_likely(embed_model, causes, cause_embeds, section)
+      for section in progress(sections)
+    ]